@@ -4,15 +4,17 @@
 """ Handles HTML output for the MIBiG sideloader """
 
 import os
-from typing import Any, List, Set
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
 
-from eutils import Client
+if TYPE_CHECKING:
+    from eutils import Client
 
 from antismash.common import path
 from antismash.common.module_results import ModuleResults
 from antismash.common.html_renderer import HTMLSections, Markup
 from antismash.common.layers import RegionLayer, RecordLayer
-from mibig.converters.read.cluster import Publication
+from mibig.converters.read.cluster import GeneAnnotation, Publication
 
 from mibig_html.common.html_renderer import FileTemplate
 from mibig_html.common.layers import OptionsLayer
@@ -25,6 +27,30 @@ def will_handle(_products: List[str], _categories: Set[str]) -> bool:
     return True
 
 
+_EUTILS_CLIENT: Optional["Client"] = None
+
+
+def _get_client() -> "Client":
+    """ Returns a process-wide eutils client, so connections and client state
+        are shared by all reference collections
+    """
+    global _EUTILS_CLIENT  # pylint: disable=global-statement
+    if _EUTILS_CLIENT is None:
+        # imported here, as eutils is only needed on a cache miss and the
+        # import is a noticeable part of CLI startup
+        from eutils import Client
+        _EUTILS_CLIENT = Client(api_key=os.environ.get("NCBI_API_KEY", None))
+    return _EUTILS_CLIENT
+
+
+@lru_cache(maxsize=None)
+def _get_template(template_name: str) -> FileTemplate:
+    """ Returns the template with the given filename, compiling it on first use
+        and reusing the compiled form for later calls
+    """
+    return FileTemplate(path.get_full_path(__file__, "templates", template_name))
+
+
 def render_template(template_name: str, **kwargs: Any) -> Markup:
     """ Returns the markup from rendering the given template with the given keyword arguments
 
@@ -35,20 +61,41 @@ def render_template(template_name: str, **kwargs: Any) -> Markup:
         Returns:
             the resulting Markup object from rendering
     """
-    template = FileTemplate(path.get_full_path(__file__, "templates", template_name))
-    return template.render(**kwargs)
+    return _get_template(template_name).render(**kwargs)
+
+
+def _apply_annotation(gene: Dict[str, Any], annot: GeneAnnotation) -> bool:
+    """ Adds the details of a MIBiG gene annotation to the given gene entry
+
+        Arguments:
+            gene: the gene entry being built for the genes template
+            annot: the annotation to pull details from
+
+        Returns:
+            True if the annotation carried comments
+    """
+    # the tailoring suffix is the same for every function of the annotation
+    suffix = f" ({', '.join(annot.tailoring)}) " if annot.tailoring else " "
+    for function in annot.functions:
+        gene["functions"].append(f"{function.category}{suffix}")
+        gene["evidences"] = sorted(set(function.evidence))
+    if annot.mutation_phenotype:
+        gene["functions"].append(f"Mutation phenotype: {annot.mutation_phenotype}")
+    if annot.product:
+        gene["product"] = annot.product
+    if annot.comments:
+        gene["comment"] = annot.comments
+        return True
+    return False
 
 
 def generate_html(region_layer: RegionLayer, results: ModuleResults,
                   record_layer: RecordLayer, _options_layer: OptionsLayer) -> HTMLSections:
     assert isinstance(results, MibigAnnotations)
     data = results.data
-    tax = results.taxonomy
-    # "class" is a reserved keyword in python, can't use it directly
-    tax_class = getattr(tax, "class")
 
     html = HTMLSections("mibig-general")
-    taxonomy_text = f"{tax.superkingdom} > {tax.kingdom} > {tax.phylum} > {tax_class} > {tax.order} > {tax.family} > {tax.name}"
+    taxonomy_text = results.taxonomy_text
     publications_links = ReferenceCollection(data.cluster.publications, results.pubmed_cache, results.doi_cache)
 
     general = render_template("general.html", data=results.data, taxonomy_text=taxonomy_text,
@@ -60,6 +107,15 @@ def generate_html(region_layer: RegionLayer, results: ModuleResults,
 
     genes = []
     annots = data.cluster.genes.annotations if data.cluster.genes else []
+    # index annotations by every name they can be referred to by, rather than
+    # rescanning the full annotation list for each CDS feature; a name can
+    # refer to multiple annotations, each matching a separate CDS feature
+    annot_indices: Dict[str, List[int]] = {}
+    for i, annot in enumerate(annots):
+        for annot_name in (annot.name, annot.id):
+            if annot_name:
+                annot_indices.setdefault(annot_name, []).append(i)
+    matched: Set[int] = set()
     genes_have_comments = False
     for cds_feature in region_layer.cds_children:
         gene = {
@@ -74,45 +130,25 @@ def generate_html(region_layer: RegionLayer, results: ModuleResults,
             "aa_seq": cds_feature.translation,
             "nt_seq": cds_feature.extract(record_layer.seq)
         }
-        gene["functions"] = []
-        for function in cds_feature.gene_functions:
-            function_text = str(function.function)
-            if function.tool != "mibig":
-                continue
-            if function.tool == "rule-based-clusters":
-                function_text += " ({})".format(function.description)
-            elif function.tool == "smcogs":
-                function_text += " ({})".format(function.description.split(" (")[0])
-            gene["functions"].append(function_text)
+        gene["functions"] = [str(function.function) for function in cds_feature.gene_functions
+                             if function.tool == "mibig"]
         annot_idx = -1
-        for i, annot in enumerate(annots):
-            annot_names = {annot.name, annot.id}
-            annot_names.discard(None)
-            feature_names = {cds_feature.locus_tag, cds_feature.protein_id, cds_feature.gene}
-            if feature_names.intersection(annot_names):
-                annot_idx = i
+        for feature_name in (cds_feature.locus_tag, cds_feature.protein_id, cds_feature.gene):
+            if not feature_name:
+                continue
+            for idx in annot_indices.get(feature_name, ()):
+                if idx not in matched:
+                    annot_idx = idx
+                    break
+            if annot_idx >= 0:
                 break
         if annot_idx >= 0:
-            annot = annots.pop(annot_idx)
-            for function in annot.functions:
-                function_text = function.category
-                if annot.tailoring:
-                    function_text += " ({}) ".format(", ".join(annot.tailoring))
-                else:
-                    function_text += " "
-                gene["functions"].append(function_text)
-                gene["evidences"] = sorted(set(function.evidence))
-            if annot.mutation_phenotype:
-                function_text = "Mutation phenotype: {}".format(annot.mutation_phenotype)
-                gene["functions"].append(function_text)
-            if annot.product:
-                gene["product"] = annot.product
-            if annot.comments:
-                gene["comment"] = annot.comments
+            matched.add(annot_idx)
+            if _apply_annotation(gene, annots[annot_idx]):
                 genes_have_comments = True
         genes.append(gene)
-    # everything should've been popped
-    assert not annots
+    # every annotation should've been matched to a CDS feature
+    assert len(matched) == len(annots)
 
     html.add_detail_section("Genes", render_template("genes.html", genes=genes, genes_have_comments=genes_have_comments, record=record_layer),
                             class_name="mibig-genes")
@@ -144,6 +180,13 @@ def generate_html(region_layer: RegionLayer, results: ModuleResults,
     return html
 
 
+_URL_FORMATTERS = {
+    "pubmed": "https://www.ncbi.nlm.nih.gov/pubmed/{}".format,
+    "patent": "https://patents.google.com/patent/{}".format,
+    "doi": "https://dx.doi.org/{}".format,
+}
+
+
 class ReferenceLink:
     """Keep track of a single reference link."""
 
@@ -173,7 +216,7 @@ class ReferenceCollection:
 
     def __init__(self, publications: List[Publication], pubmed_cache: PubmedCache,
                  doi_cache: DoiCache) -> None:
-        self.client: Client = None
+        self.client: Optional["Client"] = None
         self.references = {}
         self.pubmed_cache = pubmed_cache
         self.doi_cache = doi_cache
@@ -181,21 +224,18 @@ class ReferenceCollection:
         dois = []
 
         for publication in publications:
-            if publication.category == "pubmed":
-                if publication.content == "0":
+            category = publication.category
+            content = publication.content
+            if category == "pubmed":
+                if content == "0":
                     continue
-                reference = "https://www.ncbi.nlm.nih.gov/pubmed/{}".format(publication.content)
-                pmids.append(publication.content)
-            elif publication.category == "patent":
-                reference = "https://patents.google.com/patent/{}".format(publication.content)
-            elif publication.category == "doi":
-                dois.append(publication.content)
-                reference = "https://dx.doi.org/{}".format(publication.content)
-            elif publication.category == "url":
-                reference = publication.content
-
-            self.references[publication.content] = ReferenceLink(
-                publication.category, reference, publication.content)
+                pmids.append(content)
+            elif category == "doi":
+                dois.append(content)
+            formatter = _URL_FORMATTERS.get(category)
+            # "url" publications are already a usable link
+            reference = formatter(content) if formatter else content
+            self.references[content] = ReferenceLink(category, reference, content)
 
         self._resolve_pmids(pmids)
         self._resolve_dois(dois)
@@ -211,7 +251,7 @@ class ReferenceCollection:
 
         if missing:
             if self.client is None:
-                self.client = Client(api_key=os.environ.get("NCBI_API_KEY", None))
+                self.client = _get_client()
             articles = self.client.efetch(db="pubmed", id=missing)
             for article in articles:
                 self.pubmed_cache.add(article.title, article.authors,
@@ -223,6 +263,11 @@ class ReferenceCollection:
             self.references[pmid].info = entry.info
 
     def _resolve_dois(self, dois: List[str]) -> None:
+        if not dois:
+            return
+
+        self.doi_cache.resolve_many(dois)
+
         for doi in dois:
             entry = self.doi_cache.get(doi)
             self.references[doi].title = entry.title
@@ -3,8 +3,10 @@
 
 """ MiBIG specific sideloading """
 
-import json
-from typing import Any, Dict, List, Optional
+from functools import cached_property, lru_cache
+from itertools import chain
+import os
+from typing import Any, Dict, Iterable, List, Optional
 import logging
 
 from antismash.common.errors import AntismashInputError
@@ -19,11 +21,71 @@ from antismash.common.secmet.locations import (
 from mibig.converters.read.top import Everything
 from mibig_taxa import TaxonCache  # pylint: disable=no-name-in-module
 
+from mibig_html.common import json
 from mibig_html.common.secmet import Record
 
 from .references import DoiCache, PubmedCache
 
 
+def _build_area(data: Everything, record: Record) -> SubRegion:
+    """ Builds the subregion covering the annotated loci of the given record
+
+        Arguments:
+            data: the annotation data for the entry
+            record: the record the area will belong to
+
+        Returns:
+            a SubRegion labelled with the entry's biosynthetic classes
+    """
+    loci = data.cluster.loci
+    location = FeatureLocation(loci.start - 1 if loci.start else 0,
+                               loci.end or len(record.seq))
+    return SubRegion(location, tool="mibig", label=", ".join(data.cluster.biosynthetic_class))
+
+
+@lru_cache(maxsize=4)
+def _get_taxon_cache(cache_file: str) -> TaxonCache:
+    """ Returns a shared taxon cache for the given file, so batch runs don't
+        reparse the cache for every record
+    """
+    return TaxonCache(cache_file)
+
+
+@lru_cache(maxsize=4)
+def _get_pubmed_cache(cache_file: str) -> PubmedCache:
+    """ Returns a shared PubMed cache for the given file """
+    return PubmedCache(cache_file)
+
+
+@lru_cache(maxsize=4)
+def _get_doi_cache(cache_file: str) -> DoiCache:
+    """ Returns a shared DOI cache for the given file """
+    return DoiCache(cache_file)
+
+
+@lru_cache(maxsize=8)
+def _load_annotations(annotations_file: str, _mtime: float, _size: int) -> Everything:
+    """ Parses the given annotations file, ignoring the extra arguments that
+        exist only to invalidate stale cache entries
+    """
+    with open(annotations_file, "rb") as handle:
+        return Everything(json.load(handle))
+
+
+def load_annotations(annotations_file: str) -> Everything:
+    """ Returns the annotation data from the given file, reusing a previous
+        parse of the file where possible
+
+        Arguments:
+            annotations_file: the path of the annotations file to load
+
+        Returns:
+            an Everything instance with the parsed data
+    """
+    stats = os.stat(annotations_file)
+    return _load_annotations(annotations_file, stats.st_mtime, stats.st_size)
+
+
 class MibigAnnotations(DetectionResults):
     def __init__(self, record_id: str, area: SubRegion, data: Everything, cache_file: str,
                  pubmed_cache_file: str, doi_cache_file: str) -> None:
@@ -33,11 +95,34 @@ class MibigAnnotations(DetectionResults):
         self.record_id = record_id
         self.area = area
 
-        cache = TaxonCache(cache_file)
-        self.taxonomy = cache.get(int(data.cluster.ncbi_tax_id))
+        # the caches are only consulted at HTML generation time, not for the
+        # reuse check, so track the paths and load lazily on first access
+        self._cache_file = cache_file
+        self._pubmed_cache_file = pubmed_cache_file
+        self._doi_cache_file = doi_cache_file
+
+    @cached_property
+    def taxonomy(self) -> Any:
+        """ The taxonomy entry for the record, loaded on first access """
+        return _get_taxon_cache(self._cache_file).get(int(self.data.cluster.ncbi_tax_id))
 
-        self.pubmed_cache = PubmedCache(pubmed_cache_file)
-        self.doi_cache = DoiCache(doi_cache_file)
+    @cached_property
+    def taxonomy_text(self) -> str:
+        """ The full taxonomy lineage as display text """
+        tax = self.taxonomy
+        # "class" is a reserved keyword in python, can't use it directly
+        return " > ".join((tax.superkingdom, tax.kingdom, tax.phylum,
+                           getattr(tax, "class"), tax.order, tax.family, tax.name))
+
+    @cached_property
+    def pubmed_cache(self) -> PubmedCache:
+        """ The shared PubMed reference cache, loaded on first access """
+        return _get_pubmed_cache(self._pubmed_cache_file)
+
+    @cached_property
+    def doi_cache(self) -> DoiCache:
+        """ The shared DOI reference cache, loaded on first access """
+        return _get_doi_cache(self._doi_cache_file)
 
     def get_predicted_subregions(self) -> List[SubRegion]:
         return [self.area]
@@ -62,9 +147,7 @@ class MibigAnnotations(DetectionResults):
     @staticmethod
     def from_json(prev: Dict[str, Any], record: Record, annotations_file: str,
                   cache_file: str, pubmed_cache_file: str, doi_cache_file: str) -> Optional["MibigAnnotations"]:
-        with open(annotations_file) as handle:
-            raw = json.load(handle)
-            data = Everything(raw)
+        data = load_annotations(annotations_file)
 
         # compare old vs new annotation, decide if we can 'reuse'
         can_reuse = True
@@ -89,12 +172,7 @@ class MibigAnnotations(DetectionResults):
 
         # if we can't reuse, stop running antismash, because CDS annotations won't be correct
         if can_reuse:
-            product = ", ".join(data.cluster.biosynthetic_class)
-            loci_region = FeatureLocation(
-                loci.start - 1 if loci.start else 0,
-                loci.end or len(record.seq)
-            )
-            area = SubRegion(loci_region, tool="mibig", label=product)
+            area = _build_area(data, record)
             return MibigAnnotations(record.id, area, data, cache_file, pubmed_cache_file, doi_cache_file)
         else:
             logging.error("Can't reuse MIBiG annotation.")
@@ -105,17 +183,9 @@ class MibigAnnotations(DetectionResults):
 def mibig_loader(annotations_file: str, cache_file: str, pubmed_cache_file: str,
                  doi_cache_file: str, record: Record) -> MibigAnnotations:
     """This method will be called only when not reusing data"""
-    with open(annotations_file) as handle:
-        raw = json.load(handle)
-        data = Everything(raw)
+    data = load_annotations(annotations_file)
 
-    product = ", ".join(data.cluster.biosynthetic_class)
-    loci = data.cluster.loci
-    loci_region = FeatureLocation(
-        loci.start - 1 if loci.start else 0,
-        loci.end or len(record.seq)
-    )
-    area = SubRegion(loci_region, tool="mibig", label=product)
+    area = _build_area(data, record)
 
     # re-annotate CDSes in the Record
     if data.cluster.genes:
@@ -132,53 +202,48 @@ def mibig_loader(annotations_file: str, cache_file: str, pubmed_cache_file: str,
                     location=location, locus_tag=gene.id, translation=translation)
                 record.add_cds_feature(cds_feature, auto_deduplicate=False)
                 record.add_alteration(f"{cds_feature.get_name()} was added")
-        # re-annotation
-        for cds_feature in record.get_cds_features_within_location(area.location):
-            locus_tag = cds_feature.locus_tag
-            protein_id = cds_feature.protein_id
-            name = cds_feature.gene
-            for annot in (data.cluster.genes.annotations if data.cluster.genes else []):
-                if locus_tag and annot.id == locus_tag:
-                    pass
-                elif protein_id and annot.id == protein_id:
-                    pass
-                elif name and annot.name == name:
-                    pass
-                else:
-                    continue
-                if annot.product:
-                    cds_feature.product = annot.product
-
-    existing = set()
-    for cds in record.get_cds_features_within_location(area.location, with_overlapping=False):
-        for name in [cds.locus_tag, cds.protein_id, cds.gene]:
-            if name is not None:
-                existing.add(name)
-
-    referenced = set()
+        # re-annotation, matching annotations by id or name via lookup tables
+        # instead of rescanning the annotation list for every CDS
+        annotations_by_id = {}
+        annotations_by_name = {}
+        for annot in data.cluster.genes.annotations:
+            if annot.id:
+                annotations_by_id[annot.id] = annot
+            if annot.name:
+                annotations_by_name[annot.name] = annot
+        # materialise the features once, since the underlying lookup rescans
+        # the record's features on every call
+        cds_in_area = list(record.get_cds_features_within_location(area.location))
+        for cds_feature in cds_in_area:
+            annot = (annotations_by_id.get(cds_feature.locus_tag)
+                     or annotations_by_id.get(cds_feature.protein_id)
+                     or annotations_by_name.get(cds_feature.gene))
+            if annot and annot.product:
+                cds_feature.product = annot.product
+
+    existing = {name
+                for cds in record.get_cds_features_within_location(area.location, with_overlapping=False)
+                for name in (cds.locus_tag, cds.protein_id, cds.gene) if name is not None}
+
+    name_sources: List[Iterable[str]] = []
     if data.cluster.genes and data.cluster.genes.annotations:
-        for gene in data.cluster.genes.annotations:
-            referenced.add(gene.id)
+        name_sources.append(gene.id for gene in data.cluster.genes.annotations)
     if data.cluster.nrp:
-        for nrps_gene in data.cluster.nrp.nrps_genes:
-            referenced.add(nrps_gene.gene_id)
-        for thio in data.cluster.nrp.thioesterases:
-            referenced.add(thio.gene)
+        name_sources.append(nrps_gene.gene_id for nrps_gene in data.cluster.nrp.nrps_genes)
+        name_sources.append(thio.gene for thio in data.cluster.nrp.thioesterases)
     if data.cluster.polyketide:
         for synthase in data.cluster.polyketide.synthases:
-            referenced.update(set(synthase.genes))
-            for module in synthase.modules:
-                referenced.update(set(module.genes))
+            name_sources.append(synthase.genes)
+            name_sources.extend(module.genes for module in synthase.modules)
     if data.cluster.saccharide:
-        for transferase in data.cluster.saccharide.glycosyltransferases:
-            referenced.add(transferase.gene_id)
-    for compound in data.cluster.compounds:
-        for moiety in compound.chem_moieties:
-            if moiety.subcluster:
-                referenced.update(set(moiety.subcluster))
+        name_sources.append(transferase.gene_id
+                            for transferase in data.cluster.saccharide.glycosyltransferases)
+    name_sources.extend(moiety.subcluster for compound in data.cluster.compounds
+                        for moiety in compound.chem_moieties if moiety.subcluster)
     if data.cluster.terpene:
-        referenced.update(data.cluster.terpene.prenyltransferases or [])
-        referenced.update(set(data.cluster.terpene.synth_cycl or []))
+        name_sources.append(data.cluster.terpene.prenyltransferases or [])
+        name_sources.append(data.cluster.terpene.synth_cycl or [])
+    referenced = set(chain.from_iterable(name_sources))
 
     missing = referenced.difference(existing)
     if missing:
@@ -3,12 +3,40 @@
 
 """ Reference storage, look up, and caching """
 
-import json
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
 import re
+import tempfile
+
 import requests
-from typing import Any, Dict, List, Optional, Set, Type
+from requests.adapters import HTTPAdapter, Retry
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+
+from mibig_html.common import json
+
+# for stripping HTML fragments with odd spacing out of reference titles
+_OPENING_TAG_PATTERN = re.compile(r"\n +<[^>]*>")
+_CLOSING_TAG_PATTERN = re.compile(r"<[^>]*>\n +")
+
+_SESSION: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    """ Returns a process-wide HTTP session with connection pooling and
+        retries with backoff for transient server errors
+    """
+    global _SESSION  # pylint: disable=global-statement
+    if _SESSION is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                              max_retries=Retry(total=3, backoff_factor=0.3,
+                                                status_forcelist=[429, 500, 502, 503]))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _SESSION = session
+    return _SESSION
 
 
 class ReferenceEntry:
@@ -68,47 +96,68 @@ class DoiEntry(ReferenceEntry):
 class ReferenceCache:
     def __init__(self, cache_file: str, entry_class: Type[ReferenceEntry], label: str) -> None:
         self.mappings: Dict[str, ReferenceEntry] = {}
+        # raw JSON values by identifier, only converted to entry instances on
+        # first use, since most runs touch a handful of the cached references
+        self._raw_entries: Dict[str, Dict[str, Any]] = {}
         self.cache_file = cache_file
         self.entry_class = entry_class
         self.label = label
         if cache_file and os.path.exists(cache_file):
-            with open(cache_file, 'r') as handle:
-                entries = json.load(handle)
-            for entry_id, entry_values in entries.items():
-                self.mappings[entry_id] = entry_class.from_json(entry_values)
+            with open(cache_file, 'rb') as handle:
+                self._raw_entries = json.load(handle)
         self._new_updates: Set[str] = set()
+        # flush at interpreter exit rather than in __del__, where writes are
+        # at the mercy of garbage collection ordering
+        atexit.register(self._flush_if_needed)
 
     def add(self, title: str, authors: List[str], year: str, journal: str, identifier: str) -> None:
         self.mappings[identifier] = self.entry_class(title, authors, year, journal, identifier)
         self._new_updates.add(identifier)
 
     def get(self, identifier: str) -> ReferenceEntry:
-        return self.mappings[identifier]
+        entry = self.mappings.get(identifier)
+        if entry is None:
+            entry = self.entry_class.from_json(self._raw_entries[identifier])
+            self.mappings[identifier] = entry
+        return entry
 
-    def get_missing(self, want: List[str]) -> List[str]:
-        have = self.mappings.keys()
-        return sorted(list(want - have))
+    def get_missing(self, want: Iterable[str]) -> List[str]:
+        missing = set(want).difference(self.mappings)
+        missing.difference_update(self._raw_entries)
+        return sorted(missing)
 
     def save(self) -> None:
         logging.debug("Updating %s cache file with %d new entries: %s",
                       self.label, len(self._new_updates), self.cache_file)
-        with open(self.cache_file, "w", encoding="utf_8") as handle:
-            json.dump({key: val.to_json() for key, val in self.mappings.items()}, handle)
-
-    def __del__(self) -> None:
-        # if the object was never fully instantiated, don't do anything with it
-        if not hasattr(self, "_new_updates"):  # ideally the last thing set in __init__
-            return
-        # then ensure there's something to save and somewhere to save to
-        if not self._new_updates or not self.cache_file:
-            return
-        # then ensure that python hasn't already cleaned up some core functionality
+        entries = dict(self._raw_entries)
+        # re-read the file first, so entries fetched by other processes
+        # sharing the cache aren't dropped by a last-writer-wins overwrite
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "rb") as handle:
+                    entries.update(json.load(handle))
+            except ValueError:
+                pass  # an unreadable file will be overwritten with good data
+        entries.update({key: val.to_json() for key, val in self.mappings.items()})
+        # write to a uniquely named sidecar file and swap it in, so an
+        # interrupted save can't truncate the existing cache and concurrent
+        # savers can't interleave writes into a shared temp file
+        handle_id, temp_file = tempfile.mkstemp(dir=os.path.dirname(self.cache_file) or ".",
+                                                prefix=os.path.basename(self.cache_file) + ".")
         try:
-            _ = (open, logging, json)
-        except NameError:
-            return
-        # finally, save the updates
-        self.save()
+            with os.fdopen(handle_id, "wb") as handle:
+                json.dump(entries, handle)
+            os.replace(temp_file, self.cache_file)
+        except BaseException:
+            os.unlink(temp_file)
+            raise
+
+    def _flush_if_needed(self) -> None:
+        """ Saves the cache, but only when there's something to save and
+            somewhere to save to
+        """
+        if self._new_updates and self.cache_file:
+            self.save()
 
 
 class PubmedCache(ReferenceCache):
@@ -125,9 +174,25 @@ class DoiCache(ReferenceCache):
         self._new_updates.add(entry.identifier)
 
     def get(self, identifier: str) -> ReferenceEntry:
-        if identifier not in self.mappings:
+        if identifier not in self.mappings and identifier not in self._raw_entries:
             self.resolve(identifier)
-        return self.mappings[identifier]
+        return super().get(identifier)
+
+    def resolve_many(self, identifiers: List[str]) -> None:
+        """ Ensures all of the given DOIs are present in the cache, fetching
+            any missing entries concurrently
+
+            Arguments:
+                identifiers: the DOIs to resolve
+
+            Returns:
+                None
+        """
+        missing = self.get_missing(identifiers)
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=min(8, len(missing))) as pool:
+            list(pool.map(self.resolve, missing))
 
     def resolve(self, identifier: str) -> ReferenceEntry:
         accepts = {
@@ -137,7 +202,7 @@ class DoiCache(ReferenceCache):
 
         def simple_request(doi: str, accept: str) -> str:
             url = f"https://dx.doi.org/{doi}"
-            req = requests.get(url, headers={"Accept": accept})
+            req = _get_session().get(url, headers={"Accept": accept})
             if req.status_code == 404:
                 raise ValueError(f"Invalid DOI: {url}")
             elif req.status_code == 204:  # valid DOI, but no json friendly version
@@ -185,8 +250,8 @@ class DoiCache(ReferenceCache):
 
             # strip HTML with odd spacing from the title
             title = values["title"]
-            title = re.sub("\n +<[^>]*>", " ", title)  # opening tags
-            title = re.sub("<[^>]*>\n +", " ", title)  # closing tags
+            title = _OPENING_TAG_PATTERN.sub(" ", title)
+            title = _CLOSING_TAG_PATTERN.sub(" ", title)
             return DoiEntry(title, authors, str(year), journal, doi)
 
         def request_bibtex(doi: str) -> Optional[DoiEntry]:
@@ -0,0 +1,106 @@
+# License: GNU Affero General Public License v3 or later
+# A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
+
+# for test files, silence irrelevant and noisy pylint warnings
+# pylint: disable=no-self-use,protected-access,missing-docstring
+
+import atexit
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from mibig_html.common import json
+from mibig_html.annotations.references import (
+    PubmedEntry,
+    ReferenceCache,
+    ReferenceEntry,
+)
+
+
+def build_raw_entry(identifier: str, title: str = "Some title.") -> dict:
+    return {"title": title, "authors": ["Someone, A"], "year": "2020",
+            "journal": "A Journal", "identifier": identifier}
+
+
+class TestEntries(unittest.TestCase):
+    def test_round_trip(self):
+        entry = ReferenceEntry.from_json(build_raw_entry("7"))
+        assert entry.to_json() == build_raw_entry("7")
+
+    def test_title_terminator(self):
+        entry = ReferenceEntry("No full stop", ["Someone, A"], "2020", "A Journal", "7")
+        assert entry.title == "No full stop."
+
+    def test_pubmed_identifier_naming(self):
+        raw = build_raw_entry("7")
+        raw["pmid"] = raw.pop("identifier")
+        entry = PubmedEntry.from_json(raw)
+        assert entry.identifier == "7"
+        assert entry.to_json() == raw
+
+
+class TestReferenceCache(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self.cache_file = os.path.join(self._temp_dir.name, "cache.json")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def build_cache(self) -> ReferenceCache:
+        cache = ReferenceCache(self.cache_file, ReferenceEntry, "test")
+        # the temporary directory is gone before interpreter exit
+        atexit.unregister(cache._flush_if_needed)
+        return cache
+
+    def write_raw(self, entries: dict) -> None:
+        with open(self.cache_file, "wb") as handle:
+            json.dump(entries, handle)
+
+    def test_lazy_conversion(self):
+        self.write_raw({"1": build_raw_entry("1"), "2": build_raw_entry("2")})
+        cache = self.build_cache()
+        assert not cache.mappings
+        entry = cache.get("1")
+        assert entry.identifier == "1"
+        assert list(cache.mappings) == ["1"]
+        # repeated gets reuse the converted instance
+        assert cache.get("1") is entry
+
+    def test_get_missing_spans_both_stores(self):
+        self.write_raw({"1": build_raw_entry("1")})
+        cache = self.build_cache()
+        cache.add("A title", ["Someone, A"], "2021", "A Journal", "2")
+        assert cache.get_missing(["4", "1", "2", "3"]) == ["3", "4"]
+
+    def test_save_round_trip(self):
+        cache = self.build_cache()
+        cache.add("A title", ["Someone, A"], "2021", "A Journal", "2")
+        cache.save()
+        reloaded = self.build_cache()
+        assert reloaded.get("2").title == "A title."
+
+    def test_save_merges_concurrent_writes(self):
+        self.write_raw({"1": build_raw_entry("1")})
+        cache = self.build_cache()
+        cache.add("A title", ["Someone, A"], "2021", "A Journal", "2")
+        # another process sharing the cache file saves its own fetches
+        self.write_raw({"1": build_raw_entry("1"), "3": build_raw_entry("3")})
+        cache.save()
+        reloaded = self.build_cache()
+        assert reloaded.get_missing(["1", "2", "3"]) == []
+
+    def test_save_replaces_corrupt_cache(self):
+        cache = self.build_cache()
+        cache.add("A title", ["Someone, A"], "2021", "A Journal", "2")
+        with open(self.cache_file, "w", encoding="utf-8") as handle:
+            handle.write("{ not json")
+        cache.save()
+        reloaded = self.build_cache()
+        assert reloaded.get("2").title == "A title."
+
+    def test_no_leftover_temp_files(self):
+        cache = self.build_cache()
+        cache.add("A title", ["Someone, A"], "2021", "A Journal", "2")
+        cache.save()
+        assert os.listdir(self._temp_dir.name) == ["cache.json"]
@@ -3,7 +3,11 @@
 
 """ Overrides some antiSMASH HTML rendering functions """
 
-from typing import Any, List
+import os
+from itertools import count
+from typing import Any, Dict, List
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from antismash.common.html_renderer import (
     collapser_start,
@@ -14,7 +18,23 @@ from antismash.common.html_renderer import (
 )
 from antismash.common.secmet import Record
 
-_TOOLTIP_COUNTER = 0
+_TOOLTIP_COUNTER = count(1)
+
+_TOOLTIP_TEMPLATE = ('<div class="help-container{cls}">'
+                     ' <div class="help-icon" data-id="{uid}"></div>'
+                     ' <span class="help-tooltip" id="{uid}">{text}</span>'
+                     '</div>')
+
+_GENE_SPAN_TEMPLATE = ('<span class="jsdomain-orflabel" data-locus="{}"'
+                       ' style="font-size:100%">{}</span>')
+
+# a single environment shared by all templates, so parsed templates are reused
+# within a process and compiled bytecode is reused across processes
+_TEMPLATE_ENV = Environment(
+    loader=FileSystemLoader(os.sep),
+    bytecode_cache=FileSystemBytecodeCache(pattern="mibig_html_%s.cache"),
+    auto_reload=False,
+)
 
 
 def help_tooltip(text: str, name: str, inline: bool = False) -> Markup:
@@ -28,13 +48,9 @@ def help_tooltip(text: str, name: str, inline: bool = False) -> Markup:
         Returns:
             A Markup instance with the constructed HTML
     """
-    global _TOOLTIP_COUNTER  # pylint: disable=global-statement
-    _TOOLTIP_COUNTER += 1
-    unique_id = "%s-help-%d" % (name, _TOOLTIP_COUNTER)
-    return Markup(('<div class="help-container{2}">'
-                   ' <div class="help-icon" data-id="{0}"></div>'
-                   ' <span class="help-tooltip" id="{0}">{1}</span>'
-                   '</div>').format(unique_id, text, "-inline" if inline else ""))
+    unique_id = f"{name}-help-{next(_TOOLTIP_COUNTER)}"
+    return Markup(_TOOLTIP_TEMPLATE.format(uid=unique_id, text=text,
+                                           cls="-inline" if inline else ""))
 
 
 def clickable_gene(name: str, record: Record, force_current: bool = False, real_name: str = None) -> Markup:
@@ -59,7 +75,7 @@ def clickable_gene(name: str, record: Record, force_current: bool = False, real_
     else:
         cds = record.get_cds_by_name(real_name)
         gene_name = cds.gene or real_name
-    return Markup(f'<span class="jsdomain-orflabel" data-locus="{real_name}" style="font-size:100%">{gene_name}</span>')
+    return Markup(_GENE_SPAN_TEMPLATE.format(real_name, gene_name))
 
 
 def clickable_gene_list(names: List[str], record: Record,
@@ -76,11 +92,24 @@ def clickable_gene_list(names: List[str], record: Record,
         Returns:
             A Markup instance with the constructed HTML
     """
-    return Markup(separator.join(clickable_gene(name, record, force_current=force_current) for name in names))
+    # gene lists can repeat names, so resolve each unique name only once
+    resolved: Dict[str, Markup] = {}
+    parts = []
+    for name in names:
+        markup = resolved.get(name)
+        if markup is None:
+            markup = clickable_gene(name, record, force_current=force_current)
+            resolved[name] = markup
+        parts.append(markup)
+    return Markup(separator.join(parts))
 
 
 class FileTemplate(_FileTemplate):  # pylint: disable=too-few-public-methods
     """ A template renderer for file templates """
+    def __init__(self, template_file: str) -> None:  # pylint: disable=super-init-not-called
+        # load via the shared environment instead of building a new one per template
+        self.template = _TEMPLATE_ENV.get_template(template_file.lstrip(os.sep))
+
     def render(self, **kwargs: Any) -> Markup:
         """ Renders the template HTML, providing any given arguments to the renderer """
         if not self.template:
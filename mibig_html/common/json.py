@@ -0,0 +1,77 @@
+# License: GNU Affero General Public License v3 or later
+# A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
+
+""" Thin JSON wrappers that use orjson when available, falling back to the
+    standard library otherwise
+"""
+
+import json as _json
+from typing import Any, IO, Union
+
+try:
+    import orjson
+    _ORJSON: Any = orjson
+except ImportError:
+    _ORJSON = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """ Deserialises an object from a JSON string or JSON bytes
+
+        Arguments:
+            data: the JSON to deserialise
+
+        Returns:
+            the deserialised object
+    """
+    if _ORJSON:
+        return _ORJSON.loads(data)
+    return _json.loads(data)
+
+
+def load(handle: IO) -> Any:
+    """ Deserialises an object from an open JSON file
+
+        Arguments:
+            handle: the open file to read from, text or binary
+
+        Returns:
+            the deserialised object
+    """
+    return loads(handle.read())
+
+
+def dumps(data: Any, sort_keys: bool = False) -> str:
+    """ Serialises an object to a JSON string
+
+        Arguments:
+            data: the object to serialise
+            sort_keys: whether to sort mapping keys in the output
+
+        Returns:
+            the serialised JSON string
+    """
+    if _ORJSON:
+        option = _ORJSON.OPT_SORT_KEYS if sort_keys else 0
+        return _ORJSON.dumps(data, option=option).decode()
+    return _json.dumps(data, sort_keys=sort_keys)
+
+
+def dump(data: Any, handle: IO, sort_keys: bool = False) -> None:
+    """ Serialises an object as JSON to an open binary file, without first
+        materialising the full serialised form in memory
+
+        Arguments:
+            data: the object to serialise
+            handle: the open binary file to write to
+            sort_keys: whether to sort mapping keys in the output
+
+        Returns:
+            None
+    """
+    if _ORJSON:
+        option = _ORJSON.OPT_SORT_KEYS if sort_keys else 0
+        handle.write(_ORJSON.dumps(data, option=option))
+        return
+    for chunk in _json.JSONEncoder(sort_keys=sort_keys).iterencode(data):
+        handle.write(chunk.encode("utf_8"))
@@ -1,7 +1,7 @@
 # License: GNU Affero General Public License v3 or later
 # A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
 
-from collections import defaultdict
+import sys
 from typing import Any, Dict, List, Set, Tuple, Type, TypeVar, Union
 
 from antismash.common.secmet.record import (
@@ -16,6 +16,11 @@ from antismash.common.secmet.record import (
 
 T = TypeVar("T", bound="Record")
 
+# attribute sets for __getattr__ dispatch, hashed once here instead of being
+# rebuilt and linearly scanned on every miss
+_PASSTHROUGH_ATTRS = frozenset({"id", "seq", "description", "name", "annotations", "dbxrefs"})
+_SLOT_ATTRS = frozenset(ASRecord.__slots__)
+
 
 def _get_biopython_cds_name(feature: SeqFeature) -> str:
     name = ""
@@ -23,7 +28,8 @@ def _get_biopython_cds_name(feature: SeqFeature) -> str:
         name = feature.qualifiers.get(qual, [""])[0]
         if name:
             break
-    return name
+    # intern the name so all copies of these short identifiers share storage
+    return sys.intern(name)
 
 
 class Record(ASRecord):
@@ -31,14 +37,14 @@ class Record(ASRecord):
         super().__init__(seq, transl_table=transl_table, **kwargs)
 
         self._altered_from_input: List[str] = []
-        self._deduplicated_cds_names: Dict[str, List[str]] = defaultdict(list)
-        self._alternative_names: Dict[str, Set[str]] = defaultdict(set)
+        self._deduplicated_cds_names: Dict[str, List[str]] = {}
+        self._alternative_names: Dict[str, Set[str]] = {}
 
     def __getattr__(self, attr: str) -> Any:
         # passthroughs to the original SeqRecord
-        if attr in ["id", "seq", "description", "name", "annotations", "dbxrefs"]:
+        if attr in _PASSTHROUGH_ATTRS:
             return getattr(self._record, attr)
-        if attr in self.__slots__:  # changed here, as ASRecord referred by name to itself
+        if attr in _SLOT_ATTRS:  # changed here, as ASRecord referred by name to itself
             return self.__getattribute__(attr)
         raise AttributeError("Record has no attribute '%s'" % attr)
 
@@ -57,25 +63,29 @@ class Record(ASRecord):
         """ Returns a set of original gene names that were altered """
         return set(self._deduplicated_cds_names)
 
-    def add_cds_feature(self, cds_feature: CDSFeature, auto_deduplicate: bool = True) -> None:
-        def add_alternative_names() -> None:
-            real_name = cds_feature.get_name()
-            for alternative in [cds_feature.locus_tag, cds_feature.gene, cds_feature.protein_id]:
-                if alternative:
-                    self._alternative_names[alternative].add(real_name)
-            assert real_name in self._alternative_names
+    def _add_alternative_names(self, cds_feature: CDSFeature) -> None:
+        """ Records all the names the given CDS feature can be referred to by """
+        # identifiers repeat heavily across the mapping, so intern them to
+        # collapse duplicate strings to one shared copy
+        real_name = sys.intern(cds_feature.get_name())
+        for alternative in [cds_feature.locus_tag, cds_feature.gene, cds_feature.protein_id]:
+            if alternative:
+                self._alternative_names.setdefault(sys.intern(alternative), set()).add(real_name)
 
+    def add_cds_feature(self, cds_feature: CDSFeature, auto_deduplicate: bool = True) -> None:
         if not auto_deduplicate:
-            add_alternative_names()
+            self._add_alternative_names(cds_feature)
             super().add_cds_feature(cds_feature)
             return
 
         original_name = cds_feature.get_name()
+        # stringifying a location walks all its parts, so only do it once
+        loc_str = str(cds_feature.location)
         duplicate_name = original_name in self._cds_by_name
-        duplicate_location = str(cds_feature.location) in self._cds_by_location
+        duplicate_location = loc_str in self._cds_by_location
 
         if not duplicate_name and not duplicate_location:
-            add_alternative_names()
+            self._add_alternative_names(cds_feature)
             super().add_cds_feature(cds_feature)
             return
 
@@ -84,12 +94,12 @@ class Record(ASRecord):
             return
 
         if duplicate_location:
-            existing = self._cds_by_location[str(cds_feature.location)]
+            existing = self._cds_by_location[loc_str]
             self.add_alteration(f"removed {cds_feature.get_name()} as a duplicate of {existing.get_name()}")
             return
 
         # which leaves only names matching, so a rename is appropriate
-        count = len(self._deduplicated_cds_names[original_name]) + 1
+        count = len(self._deduplicated_cds_names.get(original_name, ())) + 1
         new_name = f"{original_name}_rename{count}"
 
         # update the original name field with the new name
@@ -100,11 +110,11 @@ class Record(ASRecord):
         elif cds_feature.protein_id == original_name:
             cds_feature.protein_id = new_name
 
-        add_alternative_names()
+        self._add_alternative_names(cds_feature)
 
         # then add the modified feature and log the alteration
         super().add_cds_feature(cds_feature)
-        self._deduplicated_cds_names[original_name].append(new_name)
+        self._deduplicated_cds_names.setdefault(sys.intern(original_name), []).append(sys.intern(new_name))
         self.add_alteration(f"renamed CDS with name {original_name} at {cds_feature.location} to {new_name} to avoid duplicates")
 
     def get_real_cds_name(self, name: str) -> str:
@@ -120,7 +130,7 @@ class Record(ASRecord):
                 raise ValueError(f"unknown CDS/gene name: {name}") from err
         if len(results) > 1:
             raise ValueError(f"multiple features map to alternative CDS/gene name {name}")
-        return list(results)[0]
+        return next(iter(results))
 
     def add_biopython_feature(self, feature: SeqFeature) -> None:
         try:
@@ -138,7 +148,8 @@ class Record(ASRecord):
     def from_biopython(cls: Type[T], seq_record: SeqRecord, taxon: str) -> T:
         # handle some entry reference records being mislabeled as RNA (e.g. BGCs 488, 720, 1166)
         molecule_type = seq_record.annotations.get("molecule_type", "DNA")
-        if not molecule_type.upper().endswith("DNA"):
+        # only uppercase the three-char tail instead of the whole value
+        if molecule_type[-3:].upper() != "DNA":
             seq_record.annotations["molecule_type"] = "DNA"
 
         can_be_circular = taxon == "bacteria"
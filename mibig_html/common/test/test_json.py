@@ -0,0 +1,57 @@
+# License: GNU Affero General Public License v3 or later
+# A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
+
+# for test files, silence irrelevant and noisy pylint warnings
+# pylint: disable=no-self-use,protected-access,missing-docstring
+
+from io import BytesIO, StringIO
+import json as stdlib_json
+import unittest
+
+from mibig_html.common import json
+
+
+class TestWithStdlib(unittest.TestCase):
+    backend = None
+
+    def setUp(self):
+        self._original_backend = json._ORJSON
+        json._ORJSON = self.backend
+
+    def tearDown(self):
+        json._ORJSON = self._original_backend
+
+    def test_loads(self):
+        data = {"a": 1, "b": [1, 2, "three"], "c": {"nested": None}, "d": 5.5}
+        assert json.loads(stdlib_json.dumps(data)) == data
+        assert json.loads(stdlib_json.dumps(data).encode()) == data
+
+    def test_string_round_trip(self):
+        data = {"b": 1, "a": [True, False, None, "text", 5.5]}
+        assert json.loads(json.dumps(data)) == data
+
+    def test_dumps_sort_keys(self):
+        data = {"b": 1, "c": 3, "a": 2}
+        assert list(json.loads(json.dumps(data, sort_keys=True))) == ["a", "b", "c"]
+        assert list(json.loads(json.dumps(data))) == ["b", "c", "a"]
+
+    def test_load_from_handles(self):
+        data = {"a": 1, "b": ["two", None]}
+        assert json.load(BytesIO(stdlib_json.dumps(data).encode())) == data
+        assert json.load(StringIO(stdlib_json.dumps(data))) == data
+
+    def test_dump_round_trip(self):
+        data = {"a": 1, "b": [1, 2, "three"], "c": {"nested": None}}
+        handle = BytesIO()
+        json.dump(data, handle)
+        assert stdlib_json.loads(handle.getvalue()) == data
+
+    def test_dump_sort_keys(self):
+        handle = BytesIO()
+        json.dump({"b": 1, "a": 2}, handle, sort_keys=True)
+        assert list(stdlib_json.loads(handle.getvalue())) == ["a", "b"]
+
+
+@unittest.skipIf(json._ORJSON is None, "orjson not installed")
+class TestWithOrjson(TestWithStdlib):
+    backend = json._ORJSON
@@ -6,10 +6,11 @@
 """
 
 import glob
+import hashlib
 import logging
 import os
 import shutil
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 import scss
 
@@ -34,18 +35,51 @@ def get_arguments() -> ModuleArgs:
     return ModuleArgs("Output options", "html")
 
 
+def _hash_scss_sources(filenames: List[str]) -> str:
+    """ Returns a digest of the contents of the given SCSS files
+
+        Arguments:
+            filenames: the paths of the files to hash
+
+        Returns:
+            the hex digest of the combined file contents
+    """
+    digest = hashlib.blake2b()
+    for filename in sorted(filenames):
+        with open(filename, "rb") as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
 def prepare_data(_logging_only: bool = False) -> List[str]:
     """ Rebuild any dynamically buildable data """
     with path.changed_directory(path.get_full_path(__file__, "css")):
         built_file = os.path.abspath("mibig.css")
-
-        if path.is_outdated(built_file, glob.glob("*.scss")):
-            logging.info("CSS files out of date, rebuilding")
-
-            result = scss.Compiler(output_style="expanded").compile("mibig.scss")
-            assert result
-            with open("mibig.css", "w") as out:
-                out.write(result)
+        hash_file = built_file + ".hash"
+
+        sources = glob.glob("*.scss")
+        # the timestamp check is far cheaper than hashing, so use it to decide
+        # whether the sources need the full content comparison at all
+        if path.is_outdated(built_file, sources):
+            current_hash = _hash_scss_sources(sources)
+            previous_hash = ""
+            if os.path.exists(hash_file):
+                with open(hash_file, encoding="utf-8") as handle:
+                    previous_hash = handle.read().strip()
+            if current_hash == previous_hash and os.path.exists(built_file):
+                # touched but unchanged, so skip recompiling and refresh the
+                # timestamp to keep future runs on the cheap path; a missing
+                # css always needs the rebuild, whatever the hashes say
+                os.utime(built_file)
+            else:
+                logging.info("CSS files out of date, rebuilding")
+
+                result = scss.Compiler(output_style="expanded").compile("mibig.scss")
+                assert result
+                with open("mibig.css", "w") as out:
+                    out.write(result)
+                with open(hash_file, "w", encoding="utf-8") as out:
+                    out.write(current_hash)
     return []
 
 
@@ -104,10 +138,76 @@ def write_retired(data: Everything, options: ConfigType) -> None:
     generate_retired_page(data, options)
 
 
+def _sync_file(source: str, target: str, source_stats: os.stat_result) -> None:
+    """ Copies a file to the target path, unless the target already matches
+        the source's timestamp and size
+
+        Arguments:
+            source: the path of the file to copy
+            target: the path to copy to
+            source_stats: the stat results for the source file
+
+        Returns:
+            None
+    """
+    try:
+        target_stats = os.stat(target)
+    except OSError:
+        target_stats = None
+    if (target_stats is None or target_stats.st_mtime < source_stats.st_mtime
+            or target_stats.st_size != source_stats.st_size):
+        shutil.copy2(source, target)
+
+
+def _sync_tree(source: str, target: str) -> None:
+    """ Mirrors a directory tree onto the target directory, copying only files
+        that are missing or stale and removing anything no longer in the source
+
+        Arguments:
+            source: the directory to copy from
+            target: the directory to copy to
+
+        Returns:
+            None
+    """
+    os.makedirs(target, exist_ok=True)
+    expected = set()
+    with os.scandir(source) as entries:
+        for entry in entries:
+            expected.add(entry.name)
+            dest = os.path.join(target, entry.name)
+            if entry.is_dir():
+                _sync_tree(entry.path, dest)
+            else:
+                _sync_file(entry.path, dest, entry.stat())
+    _remove_unexpected(target, expected)
+
+
+def _remove_unexpected(target: str, expected: Set[str]) -> None:
+    """ Removes anything in the given directory not named in the expected set
+
+        Arguments:
+            target: the directory to clean up
+            expected: the names of files and directories allowed to remain
+
+        Returns:
+            None
+    """
+    for name in os.listdir(target):
+        if name in expected:
+            continue
+        dest = os.path.join(target, name)
+        if os.path.isdir(dest):
+            shutil.rmtree(dest)
+        else:
+            os.remove(dest)
+
+
 def copy_template_dir(template: str, output_dir: str, pattern: Optional[str] = None) -> None:
-    """ Copy files from a template directory to the output directory, removes
-        any existing directory first. If pattern is supplied, only files within
-        the template directory that match the template will be copied.
+    """ Copy files from a template directory to the output directory, skipping
+        any files the output directory already has up-to-date copies of.
+        If pattern is supplied, only files within the template directory that
+        match the template will be copied.
 
         Arguments:
             template: the source directory
@@ -117,15 +217,18 @@ def copy_template_dir(template: str, output_dir: str, pattern: Optional[str] = N
         Returns:
             None
     """
+    source_dir = path.get_full_path(__file__, template)
     target_dir = os.path.join(output_dir, template)
-    if os.path.exists(target_dir):
-        shutil.rmtree(target_dir)
-    if pattern:
-        os.makedirs(target_dir)
-        for filename in glob.glob(path.get_full_path(__file__, template, pattern)):
-            if os.path.isdir(filename):
-                shutil.copytree(filename, target_dir)
-            else:
-                shutil.copy2(filename, target_dir)
-    else:
-        shutil.copytree(path.get_full_path(__file__, template), target_dir)
+    if not pattern:
+        _sync_tree(source_dir, target_dir)
+        return
+    os.makedirs(target_dir, exist_ok=True)
+    expected = set()
+    for filename in glob.glob(os.path.join(source_dir, pattern)):
+        expected.add(os.path.basename(filename))
+        dest = os.path.join(target_dir, os.path.basename(filename))
+        if os.path.isdir(filename):
+            _sync_tree(filename, dest)
+        else:
+            _sync_file(filename, dest, os.stat(filename))
+    _remove_unexpected(target_dir, expected)
@@ -3,10 +3,11 @@
 
 """ Responsible for creating the single web page results """
 
+from functools import lru_cache
 import string
 import os
 import re
-from typing import Any, Dict, List, Set, Tuple, Union, cast
+from typing import Any, Dict, FrozenSet, List, Set, Tuple, Union, cast
 
 from mibig.converters.read.cluster import GeneAnnotation
 
@@ -32,14 +33,34 @@ from mibig.converters.read.top import Everything
 from mibig_html import annotations
 from mibig_html.common.layers import OptionsLayer
 
+# compiled once here instead of once per CDS description rewritten
+_TOTAL_NT_PATTERN = re.compile(r"\(total: .+? nt\)<br>")
+_VIEW_CONTEXT_PATTERN = re.compile(r"<a[^>]+>View genomic context</a>")
+
+# a translation table deleting every non-printable byte-range character,
+# letting str.translate strip them in a single C-level pass
+_NON_PRINTABLE_TABLE = str.maketrans("", "", "".join(chr(i) for i in range(256)
+                                                     if chr(i) not in string.printable))
+
+
+# MIBiG biosynthetic classes that don't match their antiSMASH category name
+_CATEGORY_TRANSLATIONS = {
+    "NRP": "NRPS",
+    "Polyketide": "PKS",
+}
+
+
+@lru_cache(maxsize=1)
+def _known_categories() -> FrozenSet[str]:
+    """ Returns the names of all antiSMASH rule categories, which are static
+        for the life of the process
+    """
+    return frozenset(category.name for category in hmm_detection.categories.get_rule_categories())
+
 
 def convert_categories(categories: List[str]) -> List[str]:
     """ Converts a list of MIBiG biosynthetic classes to antiSMASH categories """
-    translations = {
-        "NRP": "NRPS",
-        "Polyketide": "PKS",
-    }
-    known = {category.name for category in hmm_detection.categories.get_rule_categories()}
+    known = _known_categories()
 
     new = []
     for category in categories:
@@ -49,7 +70,7 @@ def convert_categories(categories: List[str]) -> List[str]:
         if category.lower() in known:
             new.append(category.lower())
             continue
-        replacement = translations.get(category)
+        replacement = _CATEGORY_TRANSLATIONS.get(category)
         if not replacement:
             raise ValueError(f"cannot translate MIBiG class {category} into a valid antiSMASH category")
         new.append(replacement)
@@ -82,7 +103,8 @@ def build_json_data(records: List[Record], results: List[Dict[str, ModuleResults
     js_domains: List[Dict[str, Union[str, List[JSONOrf]]]] = []
     js_results = {}
     assert len(records) == 1
-    assert len(records[0].get_regions()) == 1
+    regions = records[0].get_regions()
+    assert len(regions) == 1
     mibig_results = results[0][annotations.__name__]
     assert isinstance(mibig_results, annotations.mibig.MibigAnnotations)
 
@@ -95,16 +117,20 @@ def build_json_data(records: List[Record], results: List[Dict[str, ModuleResults
             cds_annotations = []
         update_cds_description(record, json_record, cds_annotations, mibig_results)
 
-        json_record['seq_id'] = "".join(char for char in json_record['seq_id'] if char in string.printable)
-        for region, json_region in zip(record.get_regions(), json_record['regions']):
-            json_region["product_categories"] = sorted(categories)
+        seq_id = json_record['seq_id']
+        if not seq_id.isascii():
+            seq_id = seq_id.encode("ascii", "ignore").decode()
+        json_record['seq_id'] = seq_id.translate(_NON_PRINTABLE_TABLE)
+        sorted_categories = sorted(categories)
+        for region, json_region in zip(regions, json_record['regions']):
+            json_region["product_categories"] = list(sorted_categories)
             handlers = find_plugins_for_cluster(all_modules, json_region)
             region_results = {}
             for handler in handlers:
                 # if there's no results for the module, don't let it try
                 if handler.__name__ not in results[i]:
                     continue
-                if "generate_js_domains" in dir(handler):
+                if hasattr(handler, "generate_js_domains"):
                     domains_by_region = handler.generate_js_domains(region, record)
                     if domains_by_region:
                         js_domains.append(domains_by_region)
@@ -154,6 +180,18 @@ def generate_html_sections(record: RecordLayer, results: Dict[str, ModuleResults
     return sections
 
 
+@lru_cache(maxsize=1)
+def _overview_template() -> FileTemplate:
+    """ Returns the overview page template, compiling it on first use only """
+    return FileTemplate(path.get_full_path(__file__, "templates", "overview.html"))
+
+
+@lru_cache(maxsize=1)
+def _retired_template() -> FileTemplate:
+    """ Returns the retired entry page template, compiling it on first use only """
+    return FileTemplate(path.get_full_path(__file__, "templates", "retired.html"))
+
+
 def generate_webpage(record: Record, result: Dict[str, ModuleResults],
                      options: ConfigType, all_modules: List[AntismashModule]) -> None:
     """ Generates and writes the HTML itself """
@@ -161,15 +199,16 @@ def generate_webpage(record: Record, result: Dict[str, ModuleResults],
     assert isinstance(mibig_results, annotations.MibigAnnotations)
     categories = set(convert_categories(mibig_results.data.cluster.biosynthetic_class))
 
-    # bring mibig module to the front of the module list
-    all_modules.pop(all_modules.index(annotations))
-    all_modules.insert(0, cast(AntismashModule, annotations))
+    # bring the mibig module to the front of the module list, without
+    # mutating the caller's list
+    all_modules = ([cast(AntismashModule, annotations)]
+                   + [module for module in all_modules if module is not annotations])
 
     generate_searchgtr_htmls([record], options)
     json_records, js_domains, js_results = build_json_data([record], [result], options, all_modules, categories)
     write_regions_js(json_records, options.output_dir, js_domains, js_results)
 
-    template = FileTemplate(path.get_full_path(__file__, "templates", "overview.html"))
+    template = _overview_template()
 
     options_layer = OptionsLayer(options, all_modules)
     record_layer = RecordLayer(record, None, options_layer)
@@ -193,12 +232,14 @@ def generate_webpage(record: Record, result: Dict[str, ModuleResults],
                           svg_tooltip=svg_tooltip,
                           record=record_layer, region=region, cluster=mibig_results.data.cluster,
                           annotation_filename=annotation_filename, mibig_id=mibig_id)
-    with open(os.path.join(options.output_dir, 'index.html'), 'w', encoding="utf_8") as result_file:
-        result_file.write(aux)
+    # write encoded bytes with a large buffer, since pages with embedded JSON
+    # and SVG data run to multiple megabytes
+    with open(os.path.join(options.output_dir, 'index.html'), 'wb', buffering=1024 * 1024) as result_file:
+        result_file.write(aux.encode("utf_8"))
 
 
 def generate_retired_page(data: Everything, options: ConfigType) -> None:
-    template = FileTemplate(path.get_full_path(__file__, "templates", "retired.html"))
+    template = _retired_template()
 
     options_layer = OptionsLayer(options, [])
     mibig_id = data.cluster.mibig_accession
@@ -206,8 +247,16 @@ def generate_retired_page(data: Everything, options: ConfigType) -> None:
     aux = template.render(options=options_layer,
                           reasons=data.cluster.retirement_reasons, see_also=data.cluster.see_also,
                           page_title=mibig_id, mibig_id=mibig_id)
-    with open(os.path.join(options.output_dir, 'index.html'), 'w', encoding="utf_8") as result_file:
-        result_file.write(aux)
+    # write encoded bytes with a large buffer, since pages with embedded JSON
+    # and SVG data run to multiple megabytes
+    with open(os.path.join(options.output_dir, 'index.html'), 'wb', buffering=1024 * 1024) as result_file:
+        result_file.write(aux.encode("utf_8"))
+
+
+@lru_cache(maxsize=1)
+def _cds_detail_template() -> html_renderer.FileTemplate:
+    """ Returns the CDS detail template, compiling it on first use only """
+    return html_renderer.FileTemplate(path.get_full_path(__file__, "templates", "cds_detail.html"))
 
 
 def update_cds_description(record: Record, js_record: Dict[str, Any],
@@ -222,20 +271,39 @@ def update_cds_description(record: Record, js_record: Dict[str, Any],
         if annotation.name:
             id_to_annotations[annotation.name] = annotation
 
-    template = html_renderer.FileTemplate(path.get_full_path(__file__, "templates", "cds_detail.html"))
+    template = _cds_detail_template()
+    # many ORFs share an annotation (or the lack of one), so render each
+    # distinct annotation only once per call
+    rendered_by_annotation: Dict[int, str] = {}
 
     for reg_idx, js_region in enumerate(js_record["regions"]):
         for cds_idx, js_cds in enumerate(js_region["orfs"]):
             locus = js_cds["locus_tag"]
             cds = record.get_cds_by_name(locus)
-            annotation = None
-            for name in [cds.locus_tag, cds.protein_id, cds.gene]:
-                annotation = id_to_annotations.get(name)
-                if annotation:
-                    break
-            rendered = template.render(annotation=annotation)
-            js_cds["description"] = re.sub(r"(\(total: (.+) nt\)<br>)", r"\1{}".format(rendered), str(js_cds["description"]))
+            annotation = (id_to_annotations.get(cds.locus_tag)
+                          or id_to_annotations.get(cds.protein_id)
+                          or id_to_annotations.get(cds.gene))
+            rendered = rendered_by_annotation.get(id(annotation))
+            if rendered is None:
+                rendered = str(template.render(annotation=annotation))
+                rendered_by_annotation[id(annotation)] = rendered
+            description = str(js_cds["description"])
+            # the marker is near-literal, so splice at a substring match and
+            # only fall back to the full pattern if the marker isn't found
+            start = description.find("(total: ")
+            end = description.find(" nt)<br>", start) if start != -1 else -1
+            if end != -1:
+                end += len(" nt)<br>")
+                description = description[:end] + rendered + description[end:]
+            else:
+                # a callable replacement keeps any regex-special characters in
+                # the rendered HTML literal
+                description = _TOTAL_NT_PATTERN.sub(lambda match: match.group(0) + rendered,
+                                                    description)
             if original_accession.startswith("MIBIG"):
-                js_cds["description"] = re.sub(r"<a[^>]+>View genomic context</a>", "", js_cds["description"])
+                description = _VIEW_CONTEXT_PATTERN.sub("", description)
             else:
-                js_cds["description"] = re.sub(record.id, original_accession, js_cds["description"])
+                # a plain substring replacement, since the record id would
+                # otherwise be interpreted as a pattern
+                description = description.replace(record.id, original_accession)
+            js_cds["description"] = description
@@ -2,11 +2,11 @@
 # A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
 
 from datetime import datetime
-import json
+from functools import lru_cache
 import logging
 import os
 import shutil
-import tempfile
+import zipfile
 from typing import Any, cast, Dict, List, Optional, Union
 
 import antismash
@@ -23,6 +23,7 @@ from antismash.common.secmet.locations import (
     FeatureLocation,
     locations_overlap,
 )
+from antismash.common.secmet.record import SeqFeature
 from antismash.detection import (
     cluster_hmmer,
     genefunctions,
@@ -44,14 +45,17 @@ from antismash.main import (
 from mibig.converters.read.top import Everything
 
 from mibig_html import annotations, html
+from mibig_html.common import json
 from mibig_html.common.secmet import Record
 
 
 __version__ = "3.0alpha"
 
 
+@lru_cache(maxsize=1)
 def get_all_modules() -> List[AntismashModule]:
-    """ Return a list of all modules
+    """ Return a list of all modules, cached as the registry is immutable
+        within a run
 
         Arguments:
             None
@@ -166,20 +170,30 @@ def write_outputs(results: serialiser.AntismashResults, options: ConfigType) ->
     logging.debug("Writing final genbank file to '%s'", filename)
     region.write_to_genbank(filename=filename, directory=options.output_dir, record=bio_record)
 
-    zipfile = base_filename + ".zip"
-    if os.path.exists(zipfile):
-        os.remove(zipfile)
+    zip_filename = base_filename + ".zip"
+    if os.path.exists(zip_filename):
+        os.remove(zip_filename)
     if not options.skip_zip_file:
-        logging.debug("Zipping output to '%s'", zipfile)
-        with tempfile.NamedTemporaryFile(prefix="as_zip_tmp", suffix=".zip") as temp:
-            shutil.make_archive(temp.name.replace(".zip", ""), "zip", root_dir=options.output_dir)
-            shutil.copy(temp.name, zipfile)
-            os.chmod(zipfile, 0o644)
-        assert os.path.exists(zipfile)
+        logging.debug("Zipping output to '%s'", zip_filename)
+        # stream the archive straight to its final path instead of building a
+        # temporary copy and duplicating it; light compression keeps the CPU
+        # cost down for the large SVG and genbank payloads
+        with zipfile.ZipFile(zip_filename, "w", zipfile.ZIP_DEFLATED,
+                             compresslevel=1, allowZip64=True) as archive:
+            for root, _, files in os.walk(options.output_dir):
+                for name in files:
+                    full_path = os.path.join(root, name)
+                    if os.path.abspath(full_path) == os.path.abspath(zip_filename):
+                        continue
+                    archive.write(full_path, os.path.relpath(full_path, options.output_dir))
+        os.chmod(zip_filename, 0o644)
+        assert os.path.exists(zip_filename)
 
     logging.debug("Saving mibig annotation file")
     annotation_filename = "annotations.json"
-    shutil.copy(options.mibig_json, os.path.join(options.output_dir, annotation_filename))
+    # copyfile rather than copy: no permission-bit copying, and it uses the
+    # kernel-side fast path for the data
+    shutil.copyfile(options.mibig_json, os.path.join(options.output_dir, annotation_filename))
 
 
 def _get_mibig_acc(options: ConfigType) -> str:
@@ -222,16 +236,14 @@ def pre_process_sequences(sequences: List[Record], options: ConfigType) -> List[
     # keep sequences as clean as possible and make sure they're valid
     if checking_required:
         logging.debug("Sanitising record ids and sequences")
-        # Ensure all records have unique names
-        all_record_ids = {seq.id for seq in sequences}
-        if len(all_record_ids) < len(sequences):
-            all_record_ids = set()
-            for record in sequences:
-                if record.id in all_record_ids:
-                    record.original_id = record.id
-                    record.id = generate_unique_id(record.id, all_record_ids)[0]
-                all_record_ids.add(record.id)
-            assert len(all_record_ids) == len(sequences), "%d != %d" % (len(all_record_ids), len(sequences))
+        # ensure all records have unique names, renaming in a single pass
+        # instead of precomputing the full id set to detect collisions
+        seen_record_ids: set = set()
+        for record in sequences:
+            if record.id in seen_record_ids:
+                record.original_id = record.id
+                record.id = generate_unique_id(record.id, seen_record_ids)[0]
+            seen_record_ids.add(record.id)
         sequences = [sanitise_sequence(sequences[0])]
 
     for record in sequences:
@@ -266,7 +278,17 @@ def parse_input_sequence(filename: str, taxon: str = "bacteria",
     assert len(records) == 1
     record = records[0]
 
-    if not Record.is_nucleotide_sequence(record.seq):
+    # sample both ends of large sequences first, as protein input reveals
+    # itself within a kilobase, saving a full pass over genome-sized records;
+    # an ambiguous sample still falls back to checking the whole sequence
+    sequence = record.seq
+    if len(sequence) > 2000:
+        looks_nucleotide = (Record.is_nucleotide_sequence(sequence[:1000])
+                            and Record.is_nucleotide_sequence(sequence[-1000:])
+                            ) or Record.is_nucleotide_sequence(sequence)
+    else:
+        looks_nucleotide = Record.is_nucleotide_sequence(sequence)
+    if not looks_nucleotide:
         raise AntismashInputError("protein records are not supported: %s" % record.id)
 
     # before conversion to secmet records, remove any irrelevant CDS features if possible
@@ -275,13 +297,17 @@ def parse_input_sequence(filename: str, taxon: str = "bacteria",
             end = len(record.seq)
         location = FeatureLocation(start, end)
         logging.info(f"Removing all CDS features outside area: {location}")
-        features = []
-        for feature in record.features:
-            if feature.type != "CDS":  # keep all non-CDS features
-                features.append(feature)
-            elif locations_overlap(location, feature.location):
-                features.append(feature)
-        record.features = features
+
+        def overlaps_area(feature: SeqFeature) -> bool:
+            # for the typical single-part location, two integer comparisons
+            # beat the generic overlap helper; compound locations still need it
+            if len(feature.location.parts) > 1:
+                return locations_overlap(location, feature.location)
+            return int(feature.location.start) < end and int(feature.location.end) > start
+
+        # keep all non-CDS features
+        record.features = [feature for feature in record.features
+                           if feature.type != "CDS" or overlaps_area(feature)]
 
     # remove any previous or obselete antiSMASH annotations to minimise incompatabilities
     strip_record(record)
@@ -309,7 +335,7 @@ def _run_mibig(sequence_file: Optional[str], options: ConfigType) -> int:
 
     start_time = datetime.now()
 
-    with open(options.mibig_json) as handle:
+    with open(options.mibig_json, "rb") as handle:
         data = Everything(json.load(handle))
     loci = data.cluster.loci
     start = loci.start - 1 if loci.start else 0
@@ -398,6 +424,10 @@ def run_mibig(sequence_file: Optional[str], options: ConfigType) -> int:
                               debug=options.debug):
         orig_analysis_modules = antismash.main.get_analysis_modules
         antismash.main.get_analysis_modules = lambda: [antismash.modules.clusterblast]
+        # the module list depends on the patched registry, so don't let a
+        # cached result leak across the boundary in either direction
+        get_all_modules.cache_clear()
         result = _run_mibig(sequence_file, options)
         antismash.main.get_analysis_modules = orig_analysis_modules
+        get_all_modules.cache_clear()
     return result
@@ -2,14 +2,17 @@
 # License: GNU Affero General Public License v3 or later
 # A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
 
-import glob
-import json
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 from typing import List
 
+from mibig_html.common import json
 from mibig_html.annotations.references import DoiCache, DoiEntry
 
+# how many resolutions to run between cache checkpoints
+CHECKPOINT_INTERVAL = 200
+
 SPECIAL = {
     "10.12211/2096-8280.2021-024": {  # times out for anything but HTML
         "title": "Genome mining for novel natural products in Sorangium cellulosum So0157-2 by heterologous expression",
@@ -21,10 +24,26 @@ SPECIAL = {
 }
 
 
-def fetch_all(cache_file: str, files: List[str]) -> None:
-    doi_cache = DoiCache(cache_file)
+def find_json_files(directory: str) -> list:
+    """Lists the entry json files in the given directory"""
+    return sorted(entry.path for entry in os.scandir(directory)
+                  if entry.is_file() and entry.name.endswith(".json"))
+
+
+def collect_dois(doi_cache: DoiCache, files: List[str]) -> List[str]:
+    """ Gathers all DOIs referenced by the given entry files, adding any
+        special-cased entries to the cache as they're found
+
+        Arguments:
+            doi_cache: the cache the DOIs will be resolved into
+            files: the paths of the entry files to gather from
+
+        Returns:
+            a sorted list of DOIs needing resolution
+    """
+    dois = set()
     for filename in files:
-        with open(filename) as handle:
+        with open(filename, "rb") as handle:
             data = json.load(handle)
         if "publications" not in data["cluster"]:
             continue
@@ -35,12 +54,26 @@ def fetch_all(cache_file: str, files: List[str]) -> None:
             if doi in SPECIAL:
                 doi_cache.add_entry(DoiEntry.from_json(SPECIAL[doi]))
             else:
-                try:
-                    doi_cache.get(doi)
-                    doi_cache.save()
-                except ValueError as err:
-                    print("failed to import DOIs from", filename, err)
-                    raise
+                dois.add(doi)
+    return sorted(dois)
+
+
+def fetch_all(cache_file: str, files: List[str]) -> None:
+    doi_cache = DoiCache(cache_file)
+    pending = doi_cache.get_missing(collect_dois(doi_cache, files))
+    workers = int(os.environ.get("DOI_WORKERS", "16"))
+    # resolve concurrently, as the run is dominated by doi.org latency, and
+    # checkpoint the cache between batches instead of rewriting it per DOI
+    for start in range(0, len(pending), CHECKPOINT_INTERVAL):
+        batch = pending[start:start + CHECKPOINT_INTERVAL]
+        try:
+            with ThreadPoolExecutor(max_workers=min(workers, len(batch))) as pool:
+                list(pool.map(doi_cache.resolve, batch))
+        except ValueError as err:
+            print("failed to import DOIs:", err)
+            doi_cache.save()
+            raise
+        doi_cache.save()
     doi_cache.save()
 
 
@@ -51,4 +84,4 @@ if __name__ == "__main__":
     cache = "doi_cache.json"
     if len(sys.argv) == 3:
         cache = sys.argv[2]
-    fetch_all(cache, glob.glob(f"{sys.argv[1]}/*.json"))
+    fetch_all(cache, find_json_files(sys.argv[1]))
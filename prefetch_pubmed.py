@@ -2,31 +2,66 @@
 # License: GNU Affero General Public License v3 or later
 # A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
 
-import glob
-import json
+import multiprocessing
 import os
 import sys
+import time
 
-from eutils import Client
+from eutils import Client, EutilsError
 
+from mibig_html.common import json
 from mibig_html.annotations.references import PubmedCache, PubmedEntry
 
-def extract_pmids(files: list[str]) -> list[str]:
-    """Extract all unique pmids from mibig jspn files"""
+# E-utilities caps efetch requests at 200 ids per call
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+
+def find_json_files(directory: str) -> list:
+    """Lists the entry json files in the given directory"""
+    return sorted(entry.path for entry in os.scandir(directory)
+                  if entry.is_file() and entry.name.endswith(".json"))
+
+
+def _pmids_from_file(filename: str) -> set[str]:
+    """Extract the unique pmids referenced by a single mibig json file"""
     pmids: set[str] = set()
-    for filename in files:
-        with open(filename) as handle:
-            data = json.load(handle)
-        if "publications" not in data["cluster"]:
+    with open(filename, "rb") as handle:
+        data = json.load(handle)
+    for ref in data["cluster"].get("publications", []):
+        if not ref.startswith("pubmed:"):
+            continue
+        pmid = ref.split(":", 1)[1]
+        if pmid == "0":
             continue
-        for ref in data["cluster"]["publications"]:
-            if not ref.startswith("pubmed:"):
-                continue
-            pmid = ref.split(":", 1)[1]
-            if pmid == "0":
-                continue
-            pmids.add(pmid)
-    return sorted(list(pmids))
+        pmids.add(pmid)
+    return pmids
+
+
+def extract_pmids(files: list[str]) -> list[str]:
+    """Extract all unique pmids from mibig json files"""
+    pmids: set[str] = set()
+    # each file parses independently, so spread the parsing over all cores
+    with multiprocessing.Pool() as pool:
+        for found in pool.imap_unordered(_pmids_from_file, files, chunksize=32):
+            pmids.update(found)
+    return sorted(pmids)
+
+
+def fetch_batch(client: Client, pubmed_cache: PubmedCache, batch: list[str]) -> None:
+    """Fetch a single batch of pmids into the cache, backing off on transient errors"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            articles = client.efetch(db="pubmed", id=batch)
+            break
+        except EutilsError as err:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            delay = 2 ** attempt
+            print(f"efetch failed ({err}), retrying in {delay}s")
+            time.sleep(delay)
+    for article in articles:
+        pubmed_cache.add(article.title, article.authors,
+                         article.year, article.jrnl, article.pmid)
 
 
 def fetch_all(cache_file: str, pmids: list[str]) -> None:
@@ -34,13 +69,17 @@ def fetch_all(cache_file: str, pmids: list[str]) -> None:
     client = Client(api_key=os.environ.get("NCBI_API_KEY", None))
 
     missing = pubmed_cache.get_missing(pmids)
-    while missing:
-        articles = client.efetch(db="pubmed", id=missing)
-        for article in articles:
-            pubmed_cache.add(article.title, article.authors,
-                                article.year, article.jrnl, article.pmid)
-        missing = pubmed_cache.get_missing(pmids)
-        
+    # fetch in batches of the documented request cap, since oversized requests
+    # can be truncated or rejected outright; batches stay sequential because
+    # the eutils client handles NCBI's rate limiting internally and isn't
+    # safe to share across threads
+    for start in range(0, len(missing), BATCH_SIZE):
+        fetch_batch(client, pubmed_cache, missing[start:start + BATCH_SIZE])
+
+    still_missing = pubmed_cache.get_missing(pmids)
+    if still_missing:
+        print(f"warning: {len(still_missing)} pmids not returned by pubmed:",
+              ", ".join(still_missing))
     pubmed_cache.save()
 
 
@@ -51,5 +90,5 @@ if __name__ == "__main__":
     cache = "pubmed_cache.json"
     if len(sys.argv) == 3:
         cache = sys.argv[2]
-    pmids = extract_pmids(glob.glob(f"{sys.argv[1]}/*.json"))
+    pmids = extract_pmids(find_json_files(sys.argv[1]))
     fetch_all(cache, pmids)
@@ -5,14 +5,18 @@
 """Script to generate mibig html output from mibig json file."""
 
 import argparse
+import atexit
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import json
+from functools import lru_cache
+from itertools import repeat
 import os
 from shutil import rmtree
 import sys
-from tempfile import NamedTemporaryFile
+import tempfile
+import threading
 import traceback
-from typing import List
+from typing import Dict, List, TextIO
 
 import antismash
 from antismash.common.subprocessing import execute
@@ -21,25 +25,160 @@ from mibig_taxa import TaxonCache  # pylint:disable=no-name-in-module
 
 import mibig_html
 from mibig_html import annotations
+from mibig_html.common import json
 from mibig_html.common.secmet import Record
 
 
-def run(commands: List[str]) -> bool:
+# where batch workers should send subprocess output instead of the parent's
+# stdout; set per worker process so concurrent runs don't interleave
+_SUBPROCESS_LOG = ""
+
+
+def _init_worker(log_base: str) -> None:
+    """ Gives each batch worker its own subprocess log file, derived from the
+        shared log path and the worker's pid
+    """
+    global _SUBPROCESS_LOG  # pylint: disable=global-statement
+    if log_base:
+        _SUBPROCESS_LOG = f"{log_base}.worker-{os.getpid()}"
+
+
+def run(commands: List[str], log_path: str = "") -> bool:
+    log_path = log_path or _SUBPROCESS_LOG
+    if log_path:
+        # append to a per-worker file, so parallel subprocesses don't
+        # contend for, and mangle, the parent's stdout
+        with open(log_path, "a") as handle:
+            return execute(commands, stdout=handle, stderr=handle).successful()
     return execute(commands, stdout=sys.stdout, stderr=sys.stderr).successful()
 
 
+def _genbank_sequence_length(path: str, taxon: str) -> int:
+    """ Returns the sequence length of the first record in a genbank file,
+        read from the LOCUS line so the features don't need parsing; malformed
+        headers fall back to a full parse
+
+        Arguments:
+            path: the path of the genbank file
+            taxon: the taxon of the record, for the full-parse fallback
+
+        Returns:
+            the length of the sequence
+    """
+    with open(path, encoding="utf-8") as handle:
+        tokens = handle.readline().split()
+    # e.g. LOCUS       BGC0000001              18278 bp    DNA ...
+    if len(tokens) >= 4 and tokens[0] == "LOCUS" and tokens[3] == "bp" and tokens[2].isdigit():
+        return int(tokens[2])
+    return len(Record.from_genbank(path, taxon=taxon)[0].seq)
+
+
+def _remove_tree(path: str) -> None:
+    """ Removes a directory tree, tolerating only the tree already being
+        absent; any other failure, e.g. permissions, still raises
+    """
+    try:
+        rmtree(path)
+    except FileNotFoundError:
+        pass
+
+
+def _looks_like_genbank(path: str) -> bool:
+    """ Returns whether a file passes a cheap structural sniff for genbank,
+        i.e. is non-empty, starts with a LOCUS header, and ends with the
+        record terminator, without parsing any of the content between
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if not size:
+        return False
+    with open(path, "rb") as handle:
+        if not handle.read(6) == b"LOCUS ":
+            return False
+        handle.seek(max(0, size - 4096))
+        return handle.read().rstrip().endswith(b"//")
+
+
+@lru_cache(maxsize=4)
+def _taxon_cache(cache_path: str) -> TaxonCache:
+    """ Returns a shared taxon cache for the given file, so batch runs don't
+        reparse the cache for every entry
+    """
+    return TaxonCache(cache_path)
+
+
+@lru_cache(maxsize=None)
+def _antismash_taxon(cache_path: str, tax_id: int) -> str:
+    """ Returns the antismash taxon for the given taxon id, cached as common
+        taxa repeat heavily across a batch
+    """
+    return _taxon_cache(cache_path).get_antismash_taxon(tax_id)
+
+
+@lru_cache(maxsize=1)
+def _modules() -> List:
+    """ Returns the full module list, built once per process """
+    all_modules = mibig_html.get_all_modules()
+    assert mibig_html.annotations in all_modules
+    return all_modules
+
+
+@lru_cache(maxsize=1)
+def _parser() -> argparse.ArgumentParser:
+    """ Returns the antismash argument parser, built once per process """
+    return antismash.config.args.build_parser(from_config_file=True, modules=_modules())
+
+
+# invariant command-line fragments for the MIBiG and plain antiSMASH runs;
+# only the per-entry parts are assembled in _main
+_BASE_ARGS = (
+    "-v",
+    "--cb-known",
+    "--minlength", "1",
+    "--genefinding-tool", "none",
+    "--allow-long-headers",
+)
+_AS_BASE_ARGS = (
+    "-v",
+    "--minlength", "1",
+    "--cb-known",
+    "--cc-mibig",
+)
+
+
+# log handles are opened once per path and kept for the life of the process,
+# rather than reopening the file for every line
+_LOG_HANDLES: Dict[str, TextIO] = {}
+_LOG_LOCK = threading.Lock()
+
+
+def _close_log_handles() -> None:
+    for handle in _LOG_HANDLES.values():
+        handle.close()
+
+
+atexit.register(_close_log_handles)
+
+
 def write_log(text: str, file_path: str) -> None:
-    with open(file_path, "a") as o:
-        o.write("[{}] {}\n".format(datetime.now().strftime('%Y-%m-%d %H:%M:%S'), text))
+    with _LOG_LOCK:
+        handle = _LOG_HANDLES.get(file_path)
+        if handle is None:
+            handle = open(file_path, "a", buffering=1)
+            _LOG_HANDLES[file_path] = handle
+        # isoformat is C-level and considerably quicker than strftime
+        timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
+        handle.write(f"[{timestamp}] {text}\n")
 
 
 def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
           log_file_path: str, mibig_version: str, mibig_only: bool, pubmed_cache: str,
           doi_cache: str, kcb_path: str) -> int:
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    os.makedirs(output_folder, exist_ok=True)
 
-    with open(json_path, "r") as json_file:
+    with open(json_path, "rb") as json_file:
         raw = json.load(json_file)
     data = Everything(raw)
     mibig_acc = data.cluster.mibig_accession
@@ -49,13 +188,12 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
     reusable_json_path = os.path.join(output_path, "{}.json".format(mibig_acc))
 
     # load/populate cache in advance, because it is needed to fetch taxonomy information
-    cache = TaxonCache(cache_path)
     try:
         tax_id = int(data.cluster.ncbi_tax_id)
-        taxon = cache.get_antismash_taxon(tax_id)
+        taxon = _antismash_taxon(cache_path, tax_id)
     except ValueError as err:
         try:
-            entry = cache.get(tax_id, True)
+            entry = _taxon_cache(cache_path).get(tax_id, True)
             write_log(
                 f"Outdated taxon {mibig_acc}: {tax_id} is now {entry.tax_id} ({err})", log_file_path)
         except ValueError as err:
@@ -67,13 +205,8 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
     if taxon == "plants":
         taxon = "fungi"
 
-    args = [
-        "-v",
-        "--cb-known",
-        "--minlength", "1",
+    args = list(_BASE_ARGS) + [
         "--taxon", taxon,
-        "--genefinding-tool", "none",
-        "--allow-long-headers",
         "--mibig-json", json_path,
         "--mibig-cache-json", cache_path,
         "--mibig-pubmed-json", pubmed_cache,
@@ -84,9 +217,8 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
     if kcb_path:
         antismash.modules.clusterblast.core._SHIPPED_DATA_DIR = kcb_path
         antismash.modules.clusterblast.known._SHIPPED_DATA_DIR = kcb_path
-    all_modules = mibig_html.get_all_modules()
-    assert mibig_html.annotations in all_modules
-    parser = antismash.config.args.build_parser(from_config_file=True, modules=all_modules)
+    all_modules = _modules()
+    parser = _parser()
 
     print("Generating MIBiG output for {}".format(mibig_acc))
     could_reuse = False
@@ -104,24 +236,21 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
 
     if not could_reuse:
         options = antismash.config.build_config(args, parser=parser, modules=all_modules)
-        if os.path.exists(output_path):
-            # remove output path, proceed with caution!
-            rmtree(output_path)
+        # remove output path, proceed with caution!
+        _remove_tree(output_path)
         try:
             mibig_html.run_mibig(gbk_path, options)
         except Exception as err:
             write_log(f"Failed to generate MIBiG page for {mibig_acc}: {err}", log_file_path)
-            if os.path.exists(output_path):
-                rmtree(output_path)
+            _remove_tree(output_path)
             raise
-            return 1
     write_log(f"Successfully {operation} MIBiG page for {mibig_acc}", log_file_path)
 
     if mibig_only or orig_taxon == "plants":
         return 0
 
     print("Generating antiSMASH output for {}".format(mibig_acc))
-    with open(os.path.join(output_path, "{}.json".format(mibig_acc)), "r") as result_json_txt:
+    with open(os.path.join(output_path, "{}.json".format(mibig_acc)), "rb") as result_json_txt:
         result_json = json.load(result_json_txt)
         assert len(result_json["records"]
                    ) == 1 and annotations.__name__ in result_json["records"][0]["modules"]
@@ -129,7 +258,7 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
     region_gbk_path = os.path.join(output_path, f"{prefix}.gbk")
     output_path = os.path.join(output_path, "generated")
     reusable_as5_json_path = os.path.join(output_path, f"{prefix}.json")
-    region_length = len(Record.from_genbank(region_gbk_path, taxon=taxon)[0].seq)
+    region_length = _genbank_sequence_length(region_gbk_path, taxon)
 
     if taxon in ["bacteria", "fungi"]:
         sideload_data = {
@@ -151,12 +280,8 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
             ],
         }
         command = ["antismash"]
-        args = [
-            "-v",
-            "--minlength", "1",
+        args = list(_AS_BASE_ARGS) + [
             "--html-title", "{}".format(mibig_acc),
-            "--cb-known",
-            "--cc-mibig",
             "--taxon", taxon,
             "--output-dir", output_path,
         ]
@@ -168,23 +293,32 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
                 write_log("Failed to reuse antiSMASH page for {}".format(mibig_acc), log_file_path)
                 rmtree(output_path)
         if not reuse_as5_success:
-            with NamedTemporaryFile() as temp:
-                with open(temp.name, "w") as handle:
-                    json.dump(sideload_data, handle)
-                args.extend(["--sideload", temp.name])
+            # a single descriptor-level write, rather than NamedTemporaryFile
+            # creating the file and a second open reopening it by name
+            fd, sideload_path = tempfile.mkstemp(suffix=".json")
+            try:
+                os.write(fd, json.dumps(sideload_data).encode())
+                os.close(fd)
+                args.extend(["--sideload", sideload_path])
                 run_success = run(command + args + [region_gbk_path])
+            finally:
+                os.unlink(sideload_path)
         if reuse_as5_success or run_success:
             write_log("Successfully generated antiSMASH page for {}".format(mibig_acc), log_file_path)
-            # finally, ensure the freshly generated genbank is loadable
+            # finally, ensure the freshly generated genbank is loadable,
+            # sniffing for truncation first so obviously broken files are
+            # rejected without the cost of a full parse
+            generated_gbk = os.path.join(output_path, f"{prefix}.gbk")
+            if not _looks_like_genbank(generated_gbk):
+                write_log(f"antiSMASH genbank for {mibig_acc} is missing or truncated", log_file_path)
+                return 1
             try:
-                antismash.common.secmet.Record.from_genbank(
-                    os.path.join(output_path, f"{prefix}.gbk"), taxon=taxon)
+                antismash.common.secmet.Record.from_genbank(generated_gbk, taxon=taxon)
             except antismash.common.secmet.errors.SecmetInvalidInputError as err:
                 write_log(f"antiSMASH genbank for {mibig_acc} cannot be re-parsed", log_file_path)
                 return 1
         else:
-            if os.path.exists(output_path):
-                rmtree(output_path)
+            _remove_tree(output_path)
             write_log("Failed to generate antiSMASH page for {}".format(mibig_acc), log_file_path)
             return 1
     elif taxon == "plants":
@@ -193,13 +327,75 @@ def _main(json_path: str, gbk_folder: str, cache_path: str, output_folder: str,
     return 0
 
 
+def _run_entry(entry: dict, defaults: argparse.Namespace) -> int:
+    """ Runs a single batch entry, using the command line arguments as
+        defaults for anything the entry doesn't specify
+
+        Arguments:
+            entry: the entry description, any required field not given here or
+                   on the command line aborts the entry before any work is done
+            defaults: the parsed command line arguments
+
+        Returns:
+            0 if the entry was generated successfully, otherwise 1
+    """
+    resolved = {field: entry.get(field, getattr(defaults, field))
+                for field in ("json", "genbanks", "cache", "output", "logfile", "mibig_version",
+                              "mibig_only", "pubmed_cache", "doi_cache", "kcb")}
+    # catch unset required fields up front, mirroring the single-entry
+    # parser.error check, rather than failing obscurely mid-generation
+    unset = [field for field in ("json", "genbanks", "output", "logfile", "mibig_version")
+             if not resolved[field]]
+    if unset:
+        print(f"batch entry {entry} missing required fields: {', '.join(unset)}", file=sys.stderr)
+        return 1
+    try:
+        return _main(resolved["json"], resolved["genbanks"], resolved["cache"],
+                     resolved["output"], resolved["logfile"], resolved["mibig_version"],
+                     resolved["mibig_only"], resolved["pubmed_cache"], resolved["doi_cache"],
+                     resolved["kcb"])
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        return 1
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """ Runs every entry in the given batch file, amortising module discovery
+        and parser construction over the batch and optionally spreading
+        independent entries over multiple worker processes
+
+        Arguments:
+            args: the parsed command line arguments
+
+        Returns:
+            the number of entries that failed
+    """
+    entries = []
+    with open(args.batch_jsonl, "rb") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    if args.workers > 1:
+        # entries are fully independent, each writing its own output
+        # directory, so they parallelise cleanly across processes
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.logfile,)) as pool:
+            return sum(pool.map(_run_entry, entries, repeat(args), chunksize=4))
+    return sum(_run_entry(entry, args) for entry in entries)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("json", type=str, help="The JSON file for the entry to run")
-    parser.add_argument("genbanks", type=str, help="The directory containing genbank files")
-    parser.add_argument("output", type=str, help="The directory to save results in")
-    parser.add_argument("logfile", type=str, help="The path of the log file to use")
-    parser.add_argument("mibig_version", type=str,
+    parser.add_argument("json", type=str, nargs="?", default="",
+                        help="The JSON file for the entry to run")
+    parser.add_argument("genbanks", type=str, nargs="?", default="",
+                        help="The directory containing genbank files")
+    parser.add_argument("output", type=str, nargs="?", default="",
+                        help="The directory to save results in")
+    parser.add_argument("logfile", type=str, nargs="?", default="",
+                        help="The path of the log file to use")
+    parser.add_argument("mibig_version", type=str, nargs="?", default="",
                         help="The version of mibig to display in results")
     parser.add_argument("-c", "--cache", type=str, default="tax_cache.json",
                         help="The cache file containing the mibig-taxa cache")
@@ -211,7 +407,23 @@ if __name__ == "__main__":
                         help="Only run the MIBiG generation, skip full antiSMASH run")
     parser.add_argument("--kcb", type=str, default="",
                         help="Specify the path to a custom KnownClusterBlast database")
+    parser.add_argument("--batch-jsonl", type=str, default="",
+                        help="A file with one JSON entry description per line, each needing"
+                             " at least a 'json' field and defaulting other fields to the"
+                             " command line values; processed in one process to avoid"
+                             " re-paying startup costs per entry")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="The number of worker processes to spread batch entries over")
     args = parser.parse_args()
+    if args.batch_jsonl:
+        error_count = _run_batch(args)
+        if error_count:
+            print(f"{error_count} entries failed, see log file for details")
+            sys.exit(1)
+        sys.exit(0)
+    if not all([args.json, args.genbanks, args.output, args.logfile, args.mibig_version]):
+        parser.error("json, genbanks, output, logfile, and mibig_version are required"
+                     " unless --batch-jsonl is given")
     if _main(args.json, args.genbanks, args.cache, args.output, args.logfile,
              args.mibig_version, args.mibig_only, args.pubmed_cache, args.doi_cache, args.kcb):
         print("Errors were encountered, see log file for details")
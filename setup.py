@@ -1,6 +1,7 @@
 """Setuptools magic to install MIBiG HTML generator."""
 import glob
 import os
+import re
 import subprocess
 import sys
 from setuptools import setup, find_packages
@@ -19,6 +20,7 @@ install_requires = [
     'eutils',
     'python-mibig',
     'mibig-taxa',
+    'orjson',
     'requests',
 ]
 
@@ -33,26 +35,22 @@ tests_require = [
 
 def read_version() -> str:
     """Read the version fromt he appropriate place in the library."""
-    with open(os.path.join('mibig_html', 'main.py'), 'r') as handle:
-        for line in handle:
-            if line.startswith('__version__'):
-                return line.split('=')[-1].strip().strip('"')
-    return "unknown"
+    text = read(os.path.join('mibig_html', 'main.py'))
+    match = re.search(r'^__version__\s*=\s*"([^"]+)"', text, re.MULTILINE)
+    return match.group(1) if match else "unknown"
 
 
 def find_data_files():
     """Setuptools package_data globbing is stupid, so make this work ourselves."""
     data_files = []
-    for pathname in glob.glob("mibig_html/**/*", recursive=True):
-        if pathname.endswith('.pyc'):
-            continue
-        if pathname.endswith('.py'):
-            continue
-        if '__pycache__' in pathname:
-            continue
-        pathname = glob.escape(pathname)
-        pathname = pathname[10:]
-        data_files.append(pathname)
+    for root, dirs, files in os.walk('mibig_html'):
+        # prune cache dirs during descent rather than filtering them afterwards
+        dirs[:] = [dirname for dirname in dirs if dirname != '__pycache__']
+        for filename in files:
+            if filename.endswith(('.py', '.pyc')):
+                continue
+            pathname = os.path.relpath(os.path.join(root, filename), 'mibig_html')
+            data_files.append(glob.escape(pathname))
     if "HARDCODE_MIBIG_GIT_VERSION" in os.environ:
         version_file = os.path.join('mibig_html', 'git_hash')
         with open(version_file, 'wt') as handle:
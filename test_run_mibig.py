@@ -0,0 +1,52 @@
+# License: GNU Affero General Public License v3 or later
+# A copy of GNU AGPL v3 should have been included in this software package in LICENSE.txt.
+
+# for test files, silence irrelevant and noisy pylint warnings
+# pylint: disable=no-self-use,protected-access,missing-docstring
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from run_mibig import _genbank_sequence_length, _looks_like_genbank
+
+GOOD_GENBANK = (
+    "LOCUS       BGC0000001              18278 bp    DNA     linear   BCT 01-JAN-2020\n"
+    "ORIGIN\n"
+    "//\n"
+)
+
+
+class TestGenbankSniffing(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self._temp_dir.name, "test.gbk")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def write(self, content: str) -> str:
+        with open(self.path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return self.path
+
+    def test_missing_file(self):
+        assert not _looks_like_genbank(self.path)
+
+    def test_empty_file(self):
+        assert not _looks_like_genbank(self.write(""))
+
+    def test_good_file(self):
+        assert _looks_like_genbank(self.write(GOOD_GENBANK))
+
+    def test_trailing_whitespace(self):
+        assert _looks_like_genbank(self.write(GOOD_GENBANK + "\n\n"))
+
+    def test_bad_header(self):
+        assert not _looks_like_genbank(self.write("ORIGIN\n//\n"))
+
+    def test_truncated(self):
+        assert not _looks_like_genbank(self.write(GOOD_GENBANK.rsplit("//", 1)[0]))
+
+    def test_length_from_locus_line(self):
+        assert _genbank_sequence_length(self.write(GOOD_GENBANK), "bacteria") == 18278